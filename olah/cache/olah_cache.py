@@ -8,7 +8,7 @@
 import os
 import struct
 import threading
-from typing import BinaryIO, Dict, Optional
+from typing import Dict, Generator, Optional, Set
 from .bitset import Bitset
 
 CURRENT_OLAH_CACHE_VERSION = 8
@@ -35,6 +35,10 @@ class OlahCacheHeader(object):
         self._block_mask_size = DEFAULT_BLOCK_MASK_MAX
         self._block_mask = Bitset(DEFAULT_BLOCK_MASK_MAX)
 
+        # Byte range of the block mask modified since the last write
+        self._dirty_mask_lo: Optional[int] = None
+        self._dirty_mask_hi: Optional[int] = None
+
     @property
     def version(self) -> int:
         return self._version
@@ -58,6 +62,16 @@ class OlahCacheHeader(object):
     def get_header_size(self):
         return self.HEADER_FIX_SIZE + len(self._block_mask.bits)
 
+    def set_block(self, block_index: int) -> None:
+        self._block_mask.set(block_index)
+        byte_index = block_index // 8
+        if self._dirty_mask_lo is None:
+            self._dirty_mask_lo = byte_index
+            self._dirty_mask_hi = byte_index
+        else:
+            self._dirty_mask_lo = min(self._dirty_mask_lo, byte_index)
+            self._dirty_mask_hi = max(self._dirty_mask_hi, byte_index)
+
     def _valid_header(self):
         if self._file_size > self._block_mask_size * self._block_size:
             raise Exception(
@@ -99,8 +113,8 @@ class OlahCacheHeader(object):
         obj._valid_header()
         return obj
 
-    def write(self, stream):
-        btyes_header = struct.pack(
+    def _pack_fix_header(self) -> bytes:
+        return struct.pack(
             "<4sQQQQ",
             self.MAGIC_NUMBER,
             self._version,
@@ -108,8 +122,25 @@ class OlahCacheHeader(object):
             self._file_size,
             self._block_mask_size,
         )
-        btyes_out = btyes_header + self._block_mask.bits
+
+    def write(self, stream):
+        btyes_out = self._pack_fix_header() + self._block_mask.bits
         stream.write(btyes_out)
+        self._dirty_mask_lo = None
+        self._dirty_mask_hi = None
+
+    def write_dirty(self, stream):
+        """
+        Rewrites the fixed header and only the modified part of the block mask.
+        The stream must already contain a complete header written by write().
+        """
+        stream.seek(0)
+        stream.write(self._pack_fix_header())
+        if self._dirty_mask_lo is not None:
+            stream.seek(self.HEADER_FIX_SIZE + self._dirty_mask_lo)
+            stream.write(self._block_mask.bits[self._dirty_mask_lo : self._dirty_mask_hi + 1])
+        self._dirty_mask_lo = None
+        self._dirty_mask_hi = None
 
 
 class OlahCache(object):
@@ -118,6 +149,14 @@ class OlahCache(object):
         self.header: Optional[OlahCacheHeader] = None
         self.is_open: bool = False
 
+        # The header size and the block size never change once the file is open,
+        # so they are read only once and accessed without taking the header lock.
+        self._data_offset: int = 0
+        self._block_size: int = block_size
+
+        # In-memory mirror of the block mask, built lazily on the first lookup
+        self._present_blocks: Optional[Set[int]] = None
+
         # Lock
         self._header_lock = threading.Lock()
 
@@ -151,6 +190,9 @@ class OlahCache(object):
                     )
                     self.header.write(f)
 
+        self._data_offset = self._get_header_size()
+        with self._header_lock:
+            self._block_size = self.header.block_size
         self.is_open = True
 
     def close(self):
@@ -162,14 +204,14 @@ class OlahCache(object):
         self.header = None
 
         self._blocks_read_cache.clear()
+        self._present_blocks = None
 
         self.is_open = False
 
     def _flush_header(self):
         with self._header_lock:
             with open(self.path, "rb+") as f:
-                f.seek(0)
-                self.header.write(f)
+                self.header.write_dirty(f)
 
     def _get_file_size(self) -> int:
         with self._header_lock:
@@ -182,15 +224,16 @@ class OlahCache(object):
         return block_number
 
     def _get_block_size(self) -> int:
-        with self._header_lock:
-            block_size = self.header.block_size
-        return block_size
+        return self._block_size
 
     def _get_header_size(self) -> int:
         with self._header_lock:
             header_size = self.header.get_header_size()
         return header_size
 
+    def _get_block_offset(self, block_index: int) -> int:
+        return self._data_offset + block_index * self._get_block_size()
+
     def _resize_header(self, block_num: int, file_size: int):
         with self._header_lock:
             self.header._block_number = block_num
@@ -199,7 +242,9 @@ class OlahCache(object):
 
     def _set_header_block(self, block_index: int):
         with self._header_lock:
-            self.header.block_mask.set(block_index)
+            self.header.set_block(block_index)
+            if self._present_blocks is not None:
+                self._present_blocks.add(block_index)
 
     def _test_header_block(self, block_index: int):
         with self._header_lock:
@@ -218,8 +263,24 @@ class OlahCache(object):
             raise Exception("This file has been close.")
         self._flush_header()
 
+    def _scan_header_blocks(self) -> Set[int]:
+        with self._header_lock:
+            bits = self.header.block_mask.bits
+            block_number = self.header.block_number
+            present_blocks = set()
+            for byte_index in range((block_number + 7) // 8):
+                byte = bits[byte_index]
+                if byte == 0:
+                    continue
+                for bit_index in range(8):
+                    if byte & (1 << bit_index):
+                        present_blocks.add(byte_index * 8 + bit_index)
+        return present_blocks
+
     def has_block(self, block_index: int) -> bool:
-        return self._test_header_block(block_index)
+        if self._present_blocks is None:
+            self._present_blocks = self._scan_header_blocks()
+        return block_index in self._present_blocks
 
     def read_block(self, block_index: int) -> Optional[bytes]:
         if not self.is_open:
@@ -235,7 +296,7 @@ class OlahCache(object):
         if not self.has_block(block_index=block_index):
             return None
 
-        offset = self._get_header_size() + (block_index * self._get_block_size())
+        offset = self._get_block_offset(block_index)
         with open(self.path, "rb") as f:
             f.seek(offset)
             raw_block = f.read(self._get_block_size())
@@ -243,17 +304,40 @@ class OlahCache(object):
             for block_offset in range(1, self._prefech_blocks + 1):
                 if block_index + block_offset >= self._get_block_number():
                     break
-                if not self.has_block(block_index=block_index):
-                    self._blocks_read_cache[block_index + block_offset] = None
-                else:
-                    prefetch_raw_block = f.read(self._get_block_size())
-                    self._blocks_read_cache[block_index + block_offset] = (
-                        self._pad_block(prefetch_raw_block)
-                    )
+                # Stop at the first missing block, the file position would be wrong after it
+                if not self.has_block(block_index=block_index + block_offset):
+                    break
+                prefetch_raw_block = f.read(self._get_block_size())
+                self._blocks_read_cache[block_index + block_offset] = (
+                    self._pad_block(prefetch_raw_block)
+                )
 
         block = self._pad_block(raw_block)
         return block
 
+    def read_range(self, start_pos: int, end_pos: int) -> Generator[bytes, None, None]:
+        """
+        Sequentially reads the raw bytes in [start_pos, end_pos) from the data region.
+
+        The caller must make sure that all blocks covering the range have been cached.
+        """
+        if not self.is_open:
+            raise Exception("This file has been closed.")
+
+        if start_pos < 0 or start_pos > end_pos or end_pos > self._get_file_size():
+            raise Exception("Invalid range.")
+
+        block_size = self._get_block_size()
+        with open(self.path, "rb") as f:
+            f.seek(self._data_offset + start_pos)
+            cur_pos = start_pos
+            while cur_pos < end_pos:
+                chunk = f.read(min(block_size, end_pos - cur_pos))
+                if not chunk:
+                    break
+                yield chunk
+                cur_pos += len(chunk)
+
     def write_block(self, block_index: int, block_bytes: bytes) -> None:
         if not self.is_open:
             raise Exception("This file has been closed.")
@@ -264,7 +348,7 @@ class OlahCache(object):
         if len(block_bytes) != self._get_block_size():
             raise Exception("Block size does not match the cache's block size.")
 
-        offset = self._get_header_size() + (block_index * self._get_block_size())
+        offset = self._get_block_offset(block_index)
         with open(self.path, "rb+") as f:
             f.seek(offset)
             if (block_index + 1) * self._get_block_size() > self._get_file_size():
@@ -297,7 +381,7 @@ class OlahCache(object):
             bin_size = f.tell()
 
         # FIXME: limit the resize method, because it may influence the _block_mask
-        new_bin_size = self._get_header_size() + file_size
+        new_bin_size = self._data_offset + file_size
         with open(self.path, "rb+") as f:
             f.seek(new_bin_size - 1)
             f.write(b'\0')
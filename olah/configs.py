@@ -55,8 +55,12 @@ class OlahRule(object):
 
 
 class OlahRuleList(object):
+    # Upper bound of remembered repo names, they come from request urls
+    ALLOW_CACHE_MAX_SIZE = 4096
+
     def __init__(self) -> None:
         self.rules: List[OlahRule] = []
+        self._allow_cache: Dict[str, bool] = {}
 
     @staticmethod
     def from_list(data: List[Dict[str, Any]]) -> "OlahRuleList":
@@ -67,12 +71,20 @@ class OlahRuleList(object):
 
     def clear(self):
         self.rules.clear()
+        self._allow_cache.clear()
 
     def allow(self, repo_name: str) -> bool:
+        # The rules are fixed once the config is loaded, so the result per repo is memoized
+        allow = self._allow_cache.get(repo_name)
+        if allow is not None:
+            return allow
         allow = False
         for rule in self.rules:
             if rule.match(repo_name):
                 allow = rule.allow
+        if len(self._allow_cache) >= self.ALLOW_CACHE_MAX_SIZE:
+            self._allow_cache.clear()
+        self._allow_cache[repo_name] = allow
         return allow
 
 
@@ -9,6 +9,10 @@ WORKER_API_TIMEOUT = 15
 CHUNK_SIZE = 4096
 LFS_FILE_BLOCK = 64 * 1024 * 1024
 
+# How long the upstream commit of a repository or revision is reused
+COMMIT_CACHE_TTL = 30
+COMMIT_CACHE_SIZE = 4096
+
 DEFAULT_LOGGER_DIR = "./logs"
 
 ORIGINAL_LOC = "oriloc"
@@ -10,6 +10,25 @@ from typing import Any, Dict
 
 
 class RepoMeta(object):
+    __slots__ = (
+        "_id",
+        "id",
+        "author",
+        "sha",
+        "lastModified",
+        "private",
+        "gated",
+        "disabled",
+        "tags",
+        "description",
+        "paperswithcode_id",
+        "downloads",
+        "likes",
+        "cardData",
+        "siblings",
+        "createdAt",
+    )
+
     def __init__(self) -> None:
         self._id = None
         self.id = None
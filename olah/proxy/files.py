@@ -39,7 +39,6 @@ from olah.utils.repo_utils import get_org_repo
 from olah.utils.rule_utils import check_cache_rules_hf
 from olah.utils.file_utils import make_dirs
 from olah.constants import CHUNK_SIZE, LFS_FILE_BLOCK, WORKER_API_TIMEOUT
-from olah.utils.zip_utils import decompress_data
 
 
 def get_block_info(pos: int, block_size: int, file_size: int) -> Tuple[int, int, int]:
@@ -88,24 +87,19 @@ async def _get_file_range_from_cache(
 ):
     start_block = start_pos // cache_file._get_block_size()
     end_block = (end_pos - 1) // cache_file._get_block_size()
-    cur_pos = start_pos
     for cur_block in range(start_block, end_block + 1):
-        _, block_start_pos, block_end_pos = get_block_info(
-            cur_pos, cache_file._get_block_size(), cache_file._get_file_size()
-        )
         if not cache_file.has_block(cur_block):
             raise Exception("Unknown exception: read block which has not been cached.")
-        raw_block = cache_file.read_block(cur_block)
-        chunk = raw_block[
-            max(start_pos, block_start_pos)
-            - block_start_pos : min(end_pos, block_end_pos)
-            - block_start_pos
-        ]
+
+    # The range is contiguous in the cache file, so read it sequentially
+    # instead of padding and slicing every block.
+    cur_pos = start_pos
+    for chunk in cache_file.read_range(start_pos, end_pos):
         yield chunk
         cur_pos += len(chunk)
 
     if cur_pos != end_pos:
-        raise Exception("The cache range from {} to {} is incomplete.")
+        raise Exception(f"The cache range from {start_pos} to {end_pos} is incomplete.")
 
 
 async def _get_file_range_from_remote(
@@ -121,30 +115,22 @@ async def _get_file_range_from_remote(
     headers["range"] = f"bytes={start_pos}-{end_pos - 1}"
 
     chunk_bytes = 0
-    raw_data = b""
     async with client.stream(
         method=remote_info.method,
         url=remote_info.url,
         headers=headers,
         timeout=WORKER_API_TIMEOUT,
         follow_redirects=True,
-    ) as response:                
-        async for raw_chunk in response.aiter_raw():
-            if not raw_chunk:
+    ) as response:
+        # httpx removes the content encoding while streaming
+        async for chunk in response.aiter_bytes():
+            if not chunk:
                 continue
-            if "content-encoding" in response.headers:
-                raw_data += raw_chunk
-            else:
-                yield raw_chunk
-            chunk_bytes += len(raw_chunk)
-
-        if "content-encoding" in response.headers:
-            final_data = decompress_data(raw_data, response.headers.get("content-encoding", None))
-            chunk_bytes = len(final_data)
-            yield final_data
+            yield chunk
+            chunk_bytes += len(chunk)
     if "content-length" in response.headers:
         if "content-encoding" in response.headers:
-            response_content_length = len(final_data)
+            response_content_length = chunk_bytes
         else:
             response_content_length = int(response.headers["content-length"])
         if end_pos - start_pos != response_content_length:
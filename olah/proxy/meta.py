@@ -7,7 +7,7 @@
 
 import os
 import shutil
-import tempfile
+import uuid
 from typing import Dict, Literal, Optional, AsyncGenerator, Union
 from urllib.parse import urljoin
 from fastapi import FastAPI, Request
@@ -15,15 +15,16 @@ from fastapi import FastAPI, Request
 import httpx
 from olah.constants import CHUNK_SIZE, WORKER_API_TIMEOUT
 
-from olah.utils.cache_utils import read_cache_request, write_cache_request
+from olah.utils.cache_utils import read_cache_body, read_cache_head, write_cache_head
 from olah.utils.rule_utils import check_cache_rules_hf
 from olah.utils.repo_utils import get_org_repo
 from olah.utils.file_utils import make_dirs
 
 async def _meta_cache_generator(save_path: str) -> AsyncGenerator[Union[int, Dict[str, str], bytes], None]:
-    cache_rq = await read_cache_request(save_path)
-    yield cache_rq["headers"]
-    yield cache_rq["content"]
+    cache_head = await read_cache_head(save_path)
+    yield cache_head["headers"]
+    async for chunk in read_cache_body(save_path, CHUNK_SIZE):
+        yield chunk
 
 
 async def _meta_proxy_generator(
@@ -34,32 +35,44 @@ async def _meta_proxy_generator(
     allow_cache: bool,
     save_path: str,
 ) -> AsyncGenerator[Union[int, Dict[str, str], bytes], None]:
-    async with httpx.AsyncClient(follow_redirects=True) as client:
-        content_chunks = []
-        async with client.stream(
-            method=method,
-            url=meta_url,
-            headers=headers,
-            timeout=WORKER_API_TIMEOUT,
-        ) as response:
-            response_status_code = response.status_code
-            response_headers = response.headers
-            yield response_headers
+    client: httpx.AsyncClient = app.state.http_client
+    async with client.stream(
+        method=method,
+        url=meta_url,
+        headers=headers,
+        timeout=WORKER_API_TIMEOUT,
+        follow_redirects=True,
+    ) as response:
+        response_status_code = response.status_code
+        response_headers = response.headers
+        yield dict(response_headers)
 
+        # Write the body to a temporary file while streaming it,
+        # and move it into place only once it is complete.
+        cache_file = None
+        if allow_cache and response_status_code == 200:
+            # Opened with "xb" rather than mkstemp, which would leave the
+            # cached file with mode 0600 instead of the umask default
+            tmp_path = f"{save_path}.{uuid.uuid4().hex}.tmp"
+            cache_file = open(tmp_path, "xb")
+        completed = False
+        try:
+            if cache_file is not None:
+                write_cache_head(cache_file, response_status_code, response_headers)
             async for raw_chunk in response.aiter_raw():
                 if not raw_chunk:
                     continue
-                content_chunks.append(raw_chunk)
+                if cache_file is not None:
+                    cache_file.write(raw_chunk)
                 yield raw_chunk
-
-        content = bytearray()
-        for chunk in content_chunks:
-            content += chunk
-
-        if allow_cache and response_status_code == 200:
-            await write_cache_request(
-                save_path, response_status_code, response_headers, bytes(content)
-            )
+            completed = True
+        finally:
+            if cache_file is not None:
+                cache_file.close()
+                if completed:
+                    os.replace(tmp_path, save_path)
+                else:
+                    os.remove(tmp_path)
 
 
 async def meta_generator(
@@ -72,6 +85,14 @@ async def meta_generator(
     method: str,
     authorization: Optional[str],
 ) -> AsyncGenerator[Union[int, Dict[str, str], bytes], None]:
+    """
+    Streams the meta info of a repository revision, from the cache or upstream.
+
+    The first item is the response headers as a plain dict, every following
+    item is a raw body chunk. The generator is async only: the routes await the
+    first item to build the StreamingResponse and hand it the rest, so the
+    chunks never go through the threadpool used for sync iterators.
+    """
     headers = {}
     if authorization is not None:
         headers["authorization"] = authorization
@@ -79,10 +100,7 @@ async def meta_generator(
     org_repo = get_org_repo(org, repo)
     # save
     repos_path = app.app_settings.config.repos_path
-    save_dir = os.path.join(
-        repos_path, f"api/{repo_type}/{org_repo}/revision/{commit}"
-    )
-    save_path = os.path.join(save_dir, f"meta_{method}.json")
+    save_path = f"{repos_path}/api/{repo_type}/{org_repo}/revision/{commit}/meta_{method}.json"
     make_dirs(save_path)
 
     use_cache = os.path.exists(save_path)
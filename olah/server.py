@@ -6,12 +6,13 @@
 # https://opensource.org/licenses/MIT.
 
 from contextlib import asynccontextmanager
+import http.cookiejar
 import os
 import glob
 import argparse
 import time
 import traceback
-from typing import Annotated, List, Optional, Union
+from typing import Annotated, Any, List, Optional, Union
 from urllib.parse import urljoin
 from fastapi import FastAPI, Header, Request, Form
 from fastapi.responses import (
@@ -26,11 +27,12 @@ from fastapi_utils.tasks import repeat_every
 
 import git
 import httpx
+import numpy as np
 
 from olah.proxy.commits import commits_generator
 from olah.proxy.pathsinfo import pathsinfo_generator
 from olah.proxy.tree import tree_generator
-from olah.utils.disk_utils import convert_bytes_to_human_readable, convert_to_bytes, get_folder_size, sort_files_by_access_time, sort_files_by_modify_time, sort_files_by_size
+from olah.utils.disk_utils import convert_bytes_to_human_readable, convert_to_bytes, get_folder_size, scan_files
 from olah.utils.url_utils import clean_path
 from olah.utils.zip_utils import decompress_data
 
@@ -52,6 +54,21 @@ if not BASE_SETTINGS:
 if not BASE_SETTINGS:
     raise Exception("Cannot import BaseSettings from pydantic or pydantic-settings")
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class MirrorJSONResponse(JSONResponse):
+    # Serialize local mirror responses with orjson when it is available.
+    # fastapi's ORJSONResponse is deprecated in recent releases, so the
+    # render method of JSONResponse is overridden instead.
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
 from olah.configs import OlahConfig
 from olah.errors import error_repo_not_found, error_page_not_found, error_revision_not_found
 from olah.mirror.repos import LocalMirrorRepo
@@ -65,7 +82,7 @@ from olah.utils.repo_utils import (
     get_newest_commit_hf,
     parse_org_repo,
 )
-from olah.constants import REPO_TYPES_MAPPING
+from olah.constants import REPO_TYPES_MAPPING, WORKER_API_TIMEOUT
 from olah.utils.logging import build_logger
 
 logger = None
@@ -124,24 +141,23 @@ async def check_disk_usage() -> None:
     files_path = os.path.join(app.app_settings.config.repos_path, "files")
     lfs_path = os.path.join(app.app_settings.config.repos_path, "lfs")
 
+    # Walk both folders once and order the files by the chosen strategy
+    paths, atimes, mtimes, sizes = scan_files([files_path, lfs_path])
     if app.app_settings.config.cache_clean_strategy == "LRU":
-        files = sort_files_by_access_time(files_path) + sort_files_by_access_time(
-            lfs_path
-        )
-        files = sorted(files, key=lambda x: x[1])
+        order = np.argsort(atimes, kind="stable")
     elif app.app_settings.config.cache_clean_strategy == "FIFO":
-        files = sort_files_by_modify_time(files_path) + sort_files_by_modify_time(
-            lfs_path
-        )
-        files = sorted(files, key=lambda x: x[1])
+        order = np.argsort(mtimes, kind="stable")
     elif app.app_settings.config.cache_clean_strategy == "LARGE_FIRST":
-        files = sort_files_by_size(files_path) + sort_files_by_size(lfs_path)
-        files = sorted(files, key=lambda x: x[1], reverse=True)
+        order = np.argsort(-sizes, kind="stable")
+    else:
+        logger.error(f"Unknown cache clean strategy: {app.app_settings.config.cache_clean_strategy}")
+        return
 
-    for filepath, index in files:
+    for index in order:
         if current_size < limit_size:
             break
-        filesize = os.path.getsize(filepath)
+        filepath = paths[index]
+        filesize = sizes[index].item()
         os.remove(filepath)
         current_size -= filesize
         logger.info(f"Remove file: {filepath}. File Size: {convert_bytes_to_human_readable(filesize)}")
@@ -153,10 +169,22 @@ async def check_disk_usage() -> None:
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Shared upstream client, so connections to the Huggingface site are kept alive and reused
+    # The client is shared by all users and forwards each user's authorization header,
+    # so its cookie jar refuses every cookie. Otherwise a Set-Cookie answered to one
+    # user's request would be replayed on everyone else's requests.
+    app.state.http_client = httpx.AsyncClient(
+        timeout=WORKER_API_TIMEOUT,
+        limits=httpx.Limits(max_connections=256, max_keepalive_connections=64),
+        cookies=http.cookiejar.CookieJar(
+            policy=http.cookiejar.DefaultCookiePolicy(allowed_domains=[])
+        ),
+    )
     # TODO: Check repo cache path
     await check_hf_connection()
     await check_disk_usage()
     yield
+    await app.state.http_client.aclose()
 
 
 # ======================
@@ -199,7 +227,7 @@ async def meta_proxy_common(repo_type: str, org: str, repo: str, commit: str, me
                 meta_data = local_repo.get_meta(commit)
                 if meta_data is None:
                     continue
-                return JSONResponse(content=meta_data)
+                return MirrorJSONResponse(content=meta_data)
         except git.exc.InvalidGitRepositoryError:
             logger.warning(f"Local repository {git_path} is not a valid git reposity.")
             continue
@@ -256,7 +284,9 @@ async def meta_proxy_common(repo_type: str, org: str, repo: str, commit: str, me
                 authorization=authorization,
             )
         headers = await generator.__anext__()
-        return StreamingResponse(generator, headers=headers)
+        return StreamingResponse(
+            generator, headers=headers, media_type="application/json"
+        )
     except httpx.ConnectTimeout:
         traceback.print_exc()
         return Response(status_code=504)
@@ -376,7 +406,7 @@ async def tree_proxy_common(
                 tree_data = local_repo.get_tree(commit, path, recursive=recursive, expand=expand)
                 if tree_data is None:
                     continue
-                return JSONResponse(content=tree_data)
+                return MirrorJSONResponse(content=tree_data)
         except git.exc.InvalidGitRepositoryError:
             logger.warning(f"Local repository {git_path} is not a valid git reposity.")
             continue
@@ -520,7 +550,7 @@ async def pathsinfo_proxy_common(repo_type: str, org: str, repo: str, commit: st
                 pathsinfo_data = local_repo.get_pathinfos(commit, paths)
                 if pathsinfo_data is None:
                     continue
-                return JSONResponse(content=pathsinfo_data)
+                return MirrorJSONResponse(content=pathsinfo_data)
         except git.exc.InvalidGitRepositoryError:
             logger.warning(f"Local repository {git_path} is not a valid git reposity.")
             continue
@@ -647,7 +677,7 @@ async def commits_proxy_common(repo_type: str, org: str, repo: str, commit: str,
                 commits_data = local_repo.get_commits(commit)
                 if commits_data is None:
                     continue
-                return JSONResponse(content=commits_data)
+                return MirrorJSONResponse(content=commits_data)
         except git.exc.InvalidGitRepositoryError:
             logger.warning(f"Local repository {git_path} is not a valid git reposity.")
             continue
@@ -7,23 +7,31 @@
 
 
 import json
-from typing import Dict, Mapping, Union
+import mmap
+import os
+from typing import Any, AsyncGenerator, BinaryIO, Dict, Mapping, Union
 
+# Cache file layout: one line of JSON with the status code and the headers,
+# followed by the raw response body. Files written by older versions are a
+# single JSON object (without a trailing newline) holding the hex-encoded body.
 
-async def write_cache_request(
-    save_path: str,
+# Bodies at least this large are served from a memory map instead of read() calls
+MMAP_BODY_THRESHOLD = 4 * 1024 * 1024
+
+
+def write_cache_head(
+    f: BinaryIO,
     status_code: int,
     headers: Union[Dict[str, str], Mapping],
-    content: bytes,
 ) -> None:
     """
-    Write the request's status code, headers, and content to a cache file.
+    Write the request's status code and headers to an open cache file.
+    The content is expected to be written right after them.
 
     Args:
-        head_path (str): The path to the cache file.
+        f (BinaryIO): The cache file opened in binary write mode.
         status_code (int): The status code of the request.
         headers (Dict[str, str]): The dictionary of response headers.
-        content (bytes): The content of the request.
 
     Returns:
         None
@@ -33,13 +41,34 @@ async def write_cache_request(
     rq = {
         "status_code": status_code,
         "headers": headers,
-        "content": content.hex(),
     }
-    with open(save_path, "w", encoding="utf-8") as f:
-        f.write(json.dumps(rq, ensure_ascii=False))
+    f.write(json.dumps(rq, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+async def write_cache_request(
+    save_path: str,
+    status_code: int,
+    headers: Union[Dict[str, str], Mapping],
+    content: bytes,
+) -> None:
+    """
+    Write the request's status code, headers, and content to a cache file.
+
+    Args:
+        head_path (str): The path to the cache file.
+        status_code (int): The status code of the request.
+        headers (Dict[str, str]): The dictionary of response headers.
+        content (bytes): The content of the request.
+
+    Returns:
+        None
+    """
+    with open(save_path, "wb") as f:
+        write_cache_head(f, status_code, headers)
+        f.write(content)
 
 
-async def read_cache_request(save_path: str) -> Dict[str, str]:
+async def read_cache_request(save_path: str) -> Dict[str, Any]:
     """
     Read the request's status code, headers, and content from a cache file.
 
@@ -47,10 +76,78 @@ async def read_cache_request(save_path: str) -> Dict[str, str]:
         save_path (str): The path to the cache file.
 
     Returns:
-        Dict[str, str]: A dictionary containing the status code, headers, and content of the request.
+        Dict[str, Any]: A dictionary containing the status code, headers, and content of the request.
+    """
+    return load_cache_request(save_path)
+
+
+def load_cache_request(save_path: str) -> Dict[str, Any]:
     """
-    with open(save_path, "r", encoding="utf-8") as f:
-        rq = json.loads(f.read())
+    Blocking version of read_cache_request, for use in worker threads.
+
+    Args:
+        save_path (str): The path to the cache file.
 
-    rq["content"] = bytes.fromhex(rq["content"])
+    Returns:
+        Dict[str, Any]: A dictionary containing the status code, headers, and content of the request.
+    """
+    with open(save_path, "rb") as f:
+        head_line = f.readline()
+        rq = json.loads(head_line)
+        if head_line.endswith(b"\n"):
+            rq["content"] = f.read()
+        else:
+            rq["content"] = bytes.fromhex(rq["content"])
     return rq
+
+
+async def read_cache_head(save_path: str) -> Dict[str, Any]:
+    """
+    Read the request's status code and headers from a cache file, without loading the content.
+
+    Args:
+        save_path (str): The path to the cache file.
+
+    Returns:
+        Dict[str, Any]: A dictionary containing the status code and headers of the request.
+    """
+    with open(save_path, "rb") as f:
+        rq = json.loads(f.readline())
+    rq.pop("content", None)
+    return rq
+
+
+async def read_cache_body(save_path: str, chunk_size: int) -> AsyncGenerator[bytes, None]:
+    """
+    Read the request's content from a cache file chunk by chunk.
+
+    Args:
+        save_path (str): The path to the cache file.
+        chunk_size (int): The maximum size of each yielded chunk.
+
+    Yields:
+        bytes: The chunks of the content.
+    """
+    with open(save_path, "rb") as f:
+        head_line = f.readline()
+        if not head_line.endswith(b"\n"):
+            # Old cache file, the content is stored in the JSON object
+            content = bytes.fromhex(json.loads(head_line)["content"])
+            for i in range(0, len(content), chunk_size):
+                yield content[i : i + chunk_size]
+            return
+        body_start = f.tell()
+        file_size = os.fstat(f.fileno()).st_size
+        if file_size - body_start >= MMAP_BODY_THRESHOLD:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                for i in range(body_start, file_size, chunk_size):
+                    yield mm[i : i + chunk_size]
+            finally:
+                mm.close()
+            return
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
@@ -5,105 +5,121 @@
 # license that can be found in the LICENSE file or at
 # https://opensource.org/licenses/MIT.
 
-import datetime
+import array
 import os
+import re
 
 import time
-from typing import List, Optional, Tuple
-
+from typing import Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+# Sizes such as "100", "512K", "512KB" or "2 GB"
+_SIZE_PATTERN = re.compile(r"^\s*(\d+)\s*([KMGT]?)B?\s*$", re.IGNORECASE)
+_SIZE_MULTIPLIERS = {
+    "": 1,
+    "K": 1024,
+    "M": 1024**2,
+    "G": 1024**3,
+    "T": 1024**4,
+}
+
+
+def _iter_files(folder_path: str) -> Iterator[os.DirEntry]:
+    """
+    Recursively yields the regular files under a folder.
+    The returned entries cache their stat result, so each file is stat-ed once.
+    """
+    try:
+        with os.scandir(folder_path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from _iter_files(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+    except OSError:
+        # Like os.walk, skip folders that are missing, unreadable or removed during the scan
+        return
 
 def get_folder_size(folder_path: str) -> int:
     total_size = 0
-    for dirpath, dirnames, filenames in os.walk(folder_path):
-        for f in filenames:
-            fp = os.path.join(dirpath, f)
-            total_size += os.path.getsize(fp)
+    for entry in _iter_files(folder_path):
+        try:
+            total_size += entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            # The file was removed after it was listed
+            continue
     return total_size
 
-def sort_files_by_access_time(folder_path: str) -> List[Tuple[str, datetime.datetime]]:
-    files = []
-
-    # Get all file paths and time
-    for dirpath, dirnames, filenames in os.walk(folder_path):
-        for f in filenames:
-            file_path = os.path.join(dirpath, f)
-            if not os.path.isfile(file_path):
+def scan_files(
+    folder_paths: Union[str, List[str]]
+) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Walks the folders once and collects the path, access time, modify time and size of every file.
+
+    Args:
+        folder_paths (Union[str, List[str]]): The folder or folders to scan.
+
+    Returns:
+        Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]: The file paths and the parallel arrays of
+            access times, modify times and sizes. Use np.argsort on one of the arrays to order the paths.
+    """
+    if isinstance(folder_paths, str):
+        folder_paths = [folder_paths]
+
+    paths = []
+    atimes = array.array("d")
+    mtimes = array.array("d")
+    sizes = array.array("q")
+    for folder_path in folder_paths:
+        for entry in _iter_files(folder_path):
+            try:
+                stat_info = entry.stat(follow_symlinks=False)
+            except OSError:
+                # The file was removed after it was listed
                 continue
-            access_time = datetime.datetime.fromtimestamp(os.path.getatime(file_path))
-            files.append((file_path, access_time))
-    
+            paths.append(entry.path)
+            atimes.append(stat_info.st_atime)
+            mtimes.append(stat_info.st_mtime)
+            sizes.append(stat_info.st_size)
+
+    return (
+        paths,
+        np.asarray(atimes, dtype=np.float64),
+        np.asarray(mtimes, dtype=np.float64),
+        np.asarray(sizes, dtype=np.int64),
+    )
+
+def sort_files_by_access_time(folder_path: str) -> List[Tuple[str, float]]:
+    paths, atimes, _, _ = scan_files(folder_path)
     # Sort by accesstime
-    sorted_files = sorted(files, key=lambda x: x[1])
-    
-    return sorted_files
-
-def sort_files_by_modify_time(folder_path: str) -> List[Tuple[str, datetime.datetime]]:
-    files = []
-
-    # Get all file paths and time
-    for dirpath, dirnames, filenames in os.walk(folder_path):
-        for f in filenames:
-            file_path = os.path.join(dirpath, f)
-            if not os.path.isfile(file_path):
-                continue
-            access_time = datetime.datetime.fromtimestamp(os.path.getmtime(file_path))
-            files.append((file_path, access_time))
-    
+    order = np.argsort(atimes, kind="stable")
+    return [(paths[i], atimes[i].item()) for i in order]
+
+def sort_files_by_modify_time(folder_path: str) -> List[Tuple[str, float]]:
+    paths, _, mtimes, _ = scan_files(folder_path)
     # Sort by modify time
-    sorted_files = sorted(files, key=lambda x: x[1])
-    
-    return sorted_files
+    order = np.argsort(mtimes, kind="stable")
+    return [(paths[i], mtimes[i].item()) for i in order]
 
 def sort_files_by_size(folder_path: str) -> List[Tuple[str, int]]:
-    files = []
-
-    # Get all file paths and sizes
-    for dirpath, dirnames, filenames in os.walk(folder_path):
-        for f in filenames:
-            file_path = os.path.join(dirpath, f)
-            if not os.path.isfile(file_path):
-                continue
-            file_size = os.path.getsize(file_path)
-            files.append((file_path, file_size))
-    
+    paths, _, _, sizes = scan_files(folder_path)
     # Sort by file size
-    sorted_files = sorted(files, key=lambda x: x[1])
-    
-    return sorted_files
+    order = np.argsort(sizes, kind="stable")
+    return [(paths[i], sizes[i].item()) for i in order]
 
 def touch_file_access_time(filename: str):
-    if not os.path.exists(filename):
+    try:
+        stat_info = os.stat(filename)
+        os.utime(filename, ns=(time.time_ns(), stat_info.st_mtime_ns))
+    except FileNotFoundError:
         return
-    now = time.time()
-    stat_info = os.stat(filename)
-    atime = stat_info.st_atime
-    mtime = stat_info.st_mtime
-    
-    os.utime(filename, times=(now, mtime))
 
 def convert_to_bytes(size_str) -> Optional[int]:
-    size_str = size_str.strip().upper()
-    multipliers = {
-        "K": 1024,
-        "M": 1024**2,
-        "G": 1024**3,
-        "T": 1024**4,
-        "KB": 1024,
-        "MB": 1024**2,
-        "GB": 1024**3,
-        "TB": 1024**4,
-    }
-
-    for unit in multipliers:
-        if size_str.endswith(unit):
-            size = int(size_str[: -len(unit)])
-            return size * multipliers[unit]
-
-    # Default use bytes
-    try:
-        return int(size_str)
-    except ValueError:
+    match = _SIZE_PATTERN.match(size_str)
+    if match is None:
         return None
+    return int(match.group(1)) * _SIZE_MULTIPLIERS[match.group(2).upper()]
 
 
 def convert_bytes_to_human_readable(bytes: int) -> str:
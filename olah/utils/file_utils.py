@@ -7,11 +7,23 @@
 
 import os
 
+# Directories already created (or found) by make_dirs. The cache cleaner only
+# removes files, so a directory seen once is assumed to keep existing.
+_KNOWN_DIRS = set()
+_KNOWN_DIRS_MAX_SIZE = 65536
+
 
 def make_dirs(path: str):
+    # If the parent exists, there is nothing to create whether path is a file or a folder
+    if os.path.dirname(path) in _KNOWN_DIRS:
+        return
     if os.path.isdir(path):
         save_dir = path
     else:
         save_dir = os.path.dirname(path)
-    if not os.path.exists(save_dir):
-        os.makedirs(save_dir, exist_ok=True)
+    if save_dir in _KNOWN_DIRS:
+        return
+    os.makedirs(save_dir, exist_ok=True)
+    if len(_KNOWN_DIRS) >= _KNOWN_DIRS_MAX_SIZE:
+        _KNOWN_DIRS.clear()
+    _KNOWN_DIRS.add(save_dir)
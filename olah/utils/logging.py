@@ -5,12 +5,14 @@
 # license that can be found in the LICENSE file or at
 # https://opensource.org/licenses/MIT.
 
+import atexit
 from asyncio import AbstractEventLoop
 import json
 import logging
 import logging.handlers
 import os
 import platform
+import queue
 import re
 import sys
 from typing import AsyncGenerator, Generator
@@ -27,7 +29,8 @@ class NoColorFormatter(logging.Formatter):
     def format(self, record):
         message = super().format(record)
         # Remove color codes from the log message
-        message = self.color_pattern.sub("", message)
+        if "\x1b" in message:
+            message = self.color_pattern.sub("", message)
         return message
 
 
@@ -85,13 +88,30 @@ def build_logger(
         handler.setFormatter(nocolor_formatter)
         handler.namer = lambda name: name.replace(".log", "") + ".log"
 
+        # Records are queued by the loggers and written to the file by a
+        # listener thread, keeping disk writes off the request path
+        queue_handler = logging.handlers.QueueHandler(queue.Queue(-1))
+        listener = logging.handlers.QueueListener(
+            queue_handler.queue, handler, respect_handler_level=True
+        )
+        listener.start()
+        atexit.register(listener.stop)
+
         for name, item in logging.root.manager.loggerDict.items():
             if isinstance(item, logging.Logger):
-                item.addHandler(handler)
+                item.addHandler(queue_handler)
 
     return logger
 
 
+def _strip_surrogates(line: str) -> str:
+    # Lone surrogates cannot be encoded by the UTF-8 file handler.
+    # ASCII-only lines, the common case, cannot contain them.
+    if line.isascii():
+        return line
+    return line.encode("utf-8", "ignore").decode("utf-8")
+
+
 class StreamToLogger(object):
     """
     Fake file-like stream object that redirects writes to a logger instance.
@@ -120,15 +140,13 @@ class StreamToLogger(object):
             # By default sys.stdout.write() expects '\n' newlines and then
             # translates them so this is still cross platform.
             if line[-1] == "\n":
-                encoded_message = line.encode("utf-8", "ignore").decode("utf-8")
-                self.logger.log(self.log_level, encoded_message.rstrip())
+                self.logger.log(self.log_level, _strip_surrogates(line).rstrip())
             else:
                 self.linebuf += line
 
     def flush(self):
         if self.linebuf != "":
-            encoded_message = self.linebuf.encode("utf-8", "ignore").decode("utf-8")
-            self.logger.log(self.log_level, encoded_message.rstrip())
+            self.logger.log(self.log_level, _strip_surrogates(self.linebuf).rstrip())
         self.linebuf = ""
 
 
@@ -5,10 +5,12 @@
 # license that can be found in the LICENSE file or at
 # https://opensource.org/licenses/MIT.
 
+from functools import lru_cache
 import platform
 import os
 
 
+@lru_cache(maxsize=1)
 def get_olah_path() -> str:
     if platform.system() == "Windows":
         olah_path = os.path.expanduser("~\\.olah")
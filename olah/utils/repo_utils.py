@@ -5,18 +5,32 @@
 # license that can be found in the LICENSE file or at
 # https://opensource.org/licenses/MIT.
 
+import asyncio
 import datetime
+from functools import lru_cache
 import os
-import glob
+import cachetools
 import tenacity
-from typing import Dict, Literal, Optional, Tuple, Union
+from typing import Dict, List, Literal, Optional, Tuple, Union
 import json
 from urllib.parse import urljoin
 import httpx
-from olah.constants import WORKER_API_TIMEOUT
-from olah.utils.cache_utils import read_cache_request
+from olah.constants import COMMIT_CACHE_SIZE, COMMIT_CACHE_TTL, WORKER_API_TIMEOUT
+from olah.utils.cache_utils import load_cache_request, read_cache_request
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
+# Commits resolved from the upstream API. The keys hold a hash of the
+# authorization header rather than the token itself.
+_newest_commit_cache = cachetools.TTLCache(maxsize=COMMIT_CACHE_SIZE, ttl=COMMIT_CACHE_TTL)
+_commit_cache = cachetools.TTLCache(maxsize=COMMIT_CACHE_SIZE, ttl=COMMIT_CACHE_TTL)
+
+
+@lru_cache(maxsize=4096)
 def get_org_repo(org: Optional[str], repo: str) -> str:
     """
     Constructs the organization/repository name.
@@ -75,9 +89,7 @@ def get_meta_save_path(
 
     """
     org_repo = get_org_repo(org, repo)
-    return os.path.join(
-        repos_path, f"api/{repo_type}/{org_repo}/revision/{commit}/meta_get.json"
-    )
+    return f"{repos_path}/api/{repo_type}/{org_repo}/revision/{commit}/meta_get.json"
 
 
 def get_meta_save_dir(
@@ -97,7 +109,7 @@ def get_meta_save_dir(
 
     """
     org_repo = get_org_repo(org, repo)
-    return os.path.join(repos_path, f"api/{repo_type}/{org_repo}/revision")
+    return f"{repos_path}/api/{repo_type}/{org_repo}/revision"
 
 
 def get_file_save_path(
@@ -124,9 +136,29 @@ def get_file_save_path(
 
     """
     org_repo = get_org_repo(org, repo)
-    return os.path.join(
-        repos_path, f"heads/{repo_type}/{org_repo}/resolve_head/{commit}/{file_path}"
-    )
+    return f"{repos_path}/heads/{repo_type}/{org_repo}/resolve_head/{commit}/{file_path}"
+
+
+def _list_meta_files(save_dir: str) -> List[str]:
+    try:
+        with os.scandir(save_dir) as it:
+            return [
+                os.path.join(entry.path, "meta_get.json")
+                for entry in it
+                if entry.is_dir(follow_symlinks=False)
+            ]
+    except FileNotFoundError:
+        return []
+
+
+def _read_meta_revision(meta_path: str) -> Optional[Tuple[datetime.datetime, str]]:
+    try:
+        request_cache = load_cache_request(meta_path)
+    except FileNotFoundError:
+        return None
+    obj = _json_loads(request_cache["content"])
+    datetime_object = datetime.datetime.fromisoformat(obj["lastModified"])
+    return datetime_object, obj["sha"]
 
 
 async def get_newest_commit_hf_offline(
@@ -150,20 +182,20 @@ async def get_newest_commit_hf_offline(
     """
     repos_path = app.app_settings.config.repos_path
     save_dir = get_meta_save_dir(repos_path, repo_type, org, repo)
-    files = glob.glob(os.path.join(save_dir, "*", "meta_head.json"))
-
-    time_revisions = []
-    for file in files:
-        with open(file, "r", encoding="utf-8") as f:
-            obj = json.loads(f.read())
-            datetime_object = datetime.datetime.fromisoformat(obj["lastModified"])
-            time_revisions.append((datetime_object, obj["sha"]))
-
-    time_revisions = sorted(time_revisions)
+    # Scan and parse the cached revisions in worker threads to keep the event loop free
+    files = await asyncio.to_thread(_list_meta_files, save_dir)
+    results = await asyncio.gather(
+        *[asyncio.to_thread(_read_meta_revision, file) for file in files],
+        return_exceptions=True,
+    )
+    # A broken or missing cache file only drops that revision
+    time_revisions = [
+        r for r in results if r is not None and not isinstance(r, BaseException)
+    ]
     if len(time_revisions) == 0:
         return None
     else:
-        return time_revisions[-1][1]
+        return max(time_revisions, key=lambda x: x[0])[1]
 
 
 async def get_newest_commit_hf(
@@ -192,16 +224,23 @@ async def get_newest_commit_hf(
     )
     if app.app_settings.config.offline:
         return await get_newest_commit_hf_offline(app, repo_type, org, repo)
+    cache_key = (url, hash(authorization))
+    cached_sha = _newest_commit_cache.get(cache_key)
+    if cached_sha is not None:
+        return cached_sha
     try:
-        async with httpx.AsyncClient() as client:
-            headers = {}
-            if authorization is not None:
-                headers["authorization"] = authorization
-            response = await client.get(url, headers=headers, timeout=WORKER_API_TIMEOUT)
-            if response.status_code != 200:
-                return await get_newest_commit_hf_offline(app, repo_type, org, repo)
-            obj = json.loads(response.text)
-        return obj.get("sha", None)
+        client: httpx.AsyncClient = app.state.http_client
+        headers = {}
+        if authorization is not None:
+            headers["authorization"] = authorization
+        response = await client.get(url, headers=headers, timeout=WORKER_API_TIMEOUT)
+        if response.status_code != 200:
+            return await get_newest_commit_hf_offline(app, repo_type, org, repo)
+        obj = _json_loads(response.content)
+        sha = obj.get("sha", None)
+        if sha is not None:
+            _newest_commit_cache[cache_key] = sha
+        return sha
     except httpx.TimeoutException as e:
         return await get_newest_commit_hf_offline(app, repo_type, org, repo)
 
@@ -232,7 +271,7 @@ async def get_commit_hf_offline(
     save_path = get_meta_save_path(repos_path, repo_type, org, repo, commit)
     if os.path.exists(save_path):
         request_cache = await read_cache_request(save_path)
-        request_cache_json = json.loads(request_cache["content"])
+        request_cache_json = _json_loads(request_cache["content"])
         return request_cache_json["sha"]
     else:
         return None
@@ -270,18 +309,25 @@ async def get_commit_hf(
     )
     if app.app_settings.config.offline:
         return await get_commit_hf_offline(app, repo_type, org, repo, commit)
+    cache_key = (url, hash(authorization))
+    cached_sha = _commit_cache.get(cache_key)
+    if cached_sha is not None:
+        return cached_sha
     try:
         headers = {}
         if authorization is not None:
             headers["authorization"] = authorization
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                url, headers=headers, timeout=WORKER_API_TIMEOUT, follow_redirects=True
-            )
-            if response.status_code not in [200, 307]:
-                return await get_commit_hf_offline(app, repo_type, org, repo, commit)
-            obj = json.loads(response.text)
-        return obj.get("sha", None)
+        client: httpx.AsyncClient = app.state.http_client
+        response = await client.get(
+            url, headers=headers, timeout=WORKER_API_TIMEOUT, follow_redirects=True
+        )
+        if response.status_code not in [200, 307]:
+            return await get_commit_hf_offline(app, repo_type, org, repo, commit)
+        obj = _json_loads(response.content)
+        sha = obj.get("sha", None)
+        if sha is not None:
+            _commit_cache[cache_key] = sha
+        return sha
     except:
         return await get_commit_hf_offline(app, repo_type, org, repo, commit)
 
@@ -324,7 +370,7 @@ async def check_commit_hf(
     headers = {}
     if authorization is not None:
         headers["authorization"] = authorization
-    async with httpx.AsyncClient() as client:
-        response = await client.request(method="HEAD", url=url, headers=headers, timeout=WORKER_API_TIMEOUT)
-        status_code = response.status_code
+    client: httpx.AsyncClient = app.state.http_client
+    response = await client.request(method="HEAD", url=url, headers=headers, timeout=WORKER_API_TIMEOUT)
+    status_code = response.status_code
     return status_code in [200, 307]
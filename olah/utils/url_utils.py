@@ -6,15 +6,24 @@
 # https://opensource.org/licenses/MIT.
 
 import datetime
+from functools import lru_cache
 import os
 import glob
-from typing import Dict, Literal, Optional, Tuple, Union
+import re
+from typing import Dict, List, Literal, Optional, Tuple, Union
 import json
-from urllib.parse import ParseResult, urlencode, urljoin, urlparse, parse_qs, urlunparse
+from urllib.parse import ParseResult, quote, unquote_plus, urljoin, urlparse, urlunparse
 import httpx
 from olah.configs import OlahConfig
 from olah.constants import WORKER_API_TIMEOUT
 
+# The proxy asks several questions about the same url in a row, so the parsed
+# form is memoized.
+_cached_urlparse = lru_cache(maxsize=4096)(urlparse)
+
+_DOTDOT_OR_BACKSLASH = re.compile(r"\.\.|\\")
+_MULTISLASH = re.compile(r"/{2,}")
+
 
 def get_url_tail(parsed_url: Union[str, ParseResult]) -> str:
     """
@@ -27,15 +36,13 @@ def get_url_tail(parsed_url: Union[str, ParseResult]) -> str:
         str: The tail of the URL, including path, parameters, query, and fragment.
     """
     if isinstance(parsed_url, str):
-        parsed_url = urlparse(parsed_url)
-    url_tail = parsed_url.path
-    if len(parsed_url.params) != 0:
-        url_tail += f";{parsed_url.params}"
-    if len(parsed_url.query) != 0:
-        url_tail += f"?{parsed_url.query}"
-    if len(parsed_url.fragment) != 0:
-        url_tail += f"#{parsed_url.fragment}"
-    return url_tail
+        parsed_url = _cached_urlparse(parsed_url)
+    return (
+        f"{parsed_url.path}"
+        f"{';' + parsed_url.params if parsed_url.params else ''}"
+        f"{'?' + parsed_url.query if parsed_url.query else ''}"
+        f"{'#' + parsed_url.fragment if parsed_url.fragment else ''}"
+    )
 
 
 def parse_range_params(file_range: str, file_size: int) -> Tuple[int, int]:
@@ -49,13 +56,12 @@ def parse_range_params(file_range: str, file_size: int) -> Tuple[int, int]:
     Returns:
         Tuple[int, int]: A tuple of start and end positions for the file range.
     """
-    if "/" in file_range:
-        file_range, _file_size = file_range.split("/", maxsplit=1)
-    else:
-        file_range = file_range
+    file_range, _, _file_size = file_range.partition("/")
     if file_range.startswith("bytes="):
         file_range = file_range[6:]
-    start_pos, end_pos = file_range.split("-")
+    start_pos, sep, end_pos = file_range.partition("-")
+    if not sep:
+        raise ValueError(f"Invalid range: {file_range}")
     if len(start_pos) != 0:
         start_pos = int(start_pos)
     else:
@@ -68,6 +74,8 @@ def parse_range_params(file_range: str, file_size: int) -> Tuple[int, int]:
 
 
 class RemoteInfo(object):
+    __slots__ = ("method", "url", "headers")
+
     def __init__(self, method: str, url: str, headers: Dict[str, str]) -> None:
         """
         Represents information about a remote request.
@@ -82,6 +90,16 @@ class RemoteInfo(object):
         self.headers = headers
 
 
+def _find_query_param(query: str, param_name: str) -> Optional[str]:
+    # Stops at the first match and only decodes the value it returns.
+    # Like parse_qs, pairs with a blank value are ignored.
+    for part in query.split("&"):
+        key, _, value = part.partition("=")
+        if value and unquote_plus(key) == param_name:
+            return unquote_plus(value)
+    return None
+
+
 def check_url_has_param_name(url: str, param_name: str) -> bool:
     """
     Checks if a URL contains a specific query parameter.
@@ -93,9 +111,8 @@ def check_url_has_param_name(url: str, param_name: str) -> bool:
     Returns:
         bool: True if the URL contains the parameter, False otherwise.
     """
-    parsed_url = urlparse(url)
-    query_params = parse_qs(parsed_url.query)
-    return param_name in query_params
+    parsed_url = _cached_urlparse(url)
+    return _find_query_param(parsed_url.query, param_name) is not None
 
 
 def get_url_param_name(url: str, param_name: str) -> Optional[str]:
@@ -109,13 +126,17 @@ def get_url_param_name(url: str, param_name: str) -> Optional[str]:
     Returns:
         Optional[str]: The value of the query parameter if found, None otherwise.
     """
-    parsed_url = urlparse(url)
-    query_params = parse_qs(parsed_url.query)
-    original_location = query_params.get(param_name)
-    if original_location:
-        return original_location[0]
-    else:
-        return None
+    parsed_url = _cached_urlparse(url)
+    return _find_query_param(parsed_url.query, param_name)
+
+
+def _other_query_parts(query: str, param_name: str) -> List[str]:
+    # Keep the other "key=value" pairs exactly as they were encoded,
+    # keys are compared decoded so that an encoded param_name also matches
+    return [
+        part for part in query.split("&")
+        if part and unquote_plus(part.partition("=")[0]) != param_name
+    ]
 
 
 def add_query_param(url: str, param_name: str, param_value: str) -> str:
@@ -130,12 +151,11 @@ def add_query_param(url: str, param_name: str, param_value: str) -> str:
     Returns:
         str: The modified URL with the added query parameter.
     """
-    parsed_url = urlparse(url)
-    query_params = parse_qs(parsed_url.query)
-
-    query_params[param_name] = [param_value]
+    parsed_url = _cached_urlparse(url)
+    query_parts = _other_query_parts(parsed_url.query, param_name)
+    query_parts.append(f"{quote(param_name, safe='')}={quote(param_value, safe='')}")
 
-    new_query = urlencode(query_params, doseq=True)
+    new_query = "&".join(query_parts)
     new_url = urlunparse(parsed_url._replace(query=new_query))
 
     return new_url
@@ -152,22 +172,26 @@ def remove_query_param(url: str, param_name: str) -> str:
     Returns:
         str: The modified URL with the parameter removed.
     """
-    parsed_url = urlparse(url)
-    query_params = parse_qs(parsed_url.query)
+    parsed_url = _cached_urlparse(url)
+    query_parts = _other_query_parts(parsed_url.query, param_name)
 
-    if param_name in query_params:
-        del query_params[param_name]
-
-    new_query = urlencode(query_params, doseq=True)
+    new_query = "&".join(query_parts)
     new_url = urlunparse(parsed_url._replace(query=new_query))
 
     return new_url
 
 
+def _clean_path_sub(match: re.Match) -> str:
+    return "/" if match.group(0) == "\\" else ""
+
+
 def clean_path(path: str) -> str:
-    while ".." in path:
-        path = path.replace("..", "")
-    path = path.replace("\\", "/")
-    while "//" in path:
-        path = path.replace("//", "/")
-    return path
\ No newline at end of file
+    # Most paths are already clean and are returned after three C-level scans
+    if ".." not in path and "\\" not in path and "//" not in path:
+        return path
+    # Removing ".." can join the dots around it into a new "..", so repeat until stable
+    prev = None
+    while prev != path:
+        prev = path
+        path = _DOTDOT_OR_BACKSLASH.sub(_clean_path_sub, path)
+    return _MULTISLASH.sub("/", path)
\ No newline at end of file
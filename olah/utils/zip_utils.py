@@ -1,42 +1,59 @@
-
+# coding=utf-8
+# Copyright 2024 XiaHan
+#
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
 
 from typing import Optional
 import zlib
 
+try:
+    import zstandard
+    # decompress() keeps no state between calls, so one instance is shared
+    _ZSTD_DEC = zstandard.ZstdDecompressor()
+except ImportError:
+    _ZSTD_DEC = None
+
 
 def decompress_data(raw_data: bytes, content_encoding: Optional[str]):
     # If result is compressed
     if content_encoding is not None:
         final_data = raw_data
+        # The encodings are listed in the order they were applied,
+        # so they are removed in reverse, each stage decoding the previous output
         algorithms = content_encoding.split(',')
-        for algo in algorithms:
+        for algo in reversed(algorithms):
             algo = algo.strip().lower()
             if algo == "gzip":
                 try:
-                    final_data = zlib.decompress(raw_data, zlib.MAX_WBITS | 16)  # 解压缩
+                    final_data = zlib.decompress(final_data, zlib.MAX_WBITS | 16)  # 解压缩
                 except Exception as e:
                     print(f"Error decompressing gzip data: {e}")
             elif algo == "compress":
                 print(f"Unsupported decompression algorithm: {algo}")
             elif algo == "deflate":
-                try: 
-                    final_data = zlib.decompress(raw_data)
+                try:
+                    final_data = zlib.decompress(final_data)
                 except Exception as e:
                     print(f"Error decompressing deflate data: {e}")
             elif algo == "br":
                 try:
+                    # Imported on first use, most bodies are never brotli encoded
                     import brotli
-                    final_data = brotli.decompress(raw_data)
+                    final_data = brotli.decompress(final_data)
                 except Exception as e:
                     print(f"Error decompressing Brotli data: {e}")
             elif algo == "zstd":
+                if _ZSTD_DEC is None:
+                    print(f"Unsupported decompression algorithm: {algo}")
+                    continue
                 try:
-                    import zstandard
-                    final_data = zstandard.ZstdDecompressor().decompress(raw_data)
+                    final_data = _ZSTD_DEC.decompress(final_data)
                 except Exception as e:
                     print(f"Error decompressing Zstandard data: {e}")
             else:
                 print(f"Unsupported compression algorithm: {algo}")
         return final_data
     else:
-        return raw_data
\ No newline at end of file
+        return raw_data